@@ -3,21 +3,103 @@ import sys
 import collections
 import hashlib
 import datetime
+import functools
 import subprocess
 import re
 import time
-import pickle
+import json
+import gzip
+import mmap
+import shutil
 import heapq
 import threading
+from operator import itemgetter
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# 可选：xxhash 的 xxh3 比 blake2b 快一个数量级，只用于查重第一轮的快速指纹
+try:
+    from xxhash import xxh3_128 as _quick_hasher
+except ImportError:
+    _quick_hasher = None
+
+# 扩展名缓存：原始后缀 -> 小写并驻留后的后缀。常见扩展名预先放入，
+# 其余在首次出现时加入；重复出现的扩展名不再调用 lower() 分配新字符串，
+# file_types 统计时键的哈希/比较也退化为指针比较
+_EXT_INTERN = {ext: sys.intern(ext) for ext in (
+    '.jpg', '.png', '.gif', '.mp4', '.mkv', '.mp3', '.log', '.txt', '.pdf',
+    '.zip', '.gz', '.py', '.js', '.json', '.html', 'no_ext')}
+_EXT_INTERN_MAX = 4096  # 防止 "app.log.2024-01-01" 这类随机后缀把缓存撑大
+
+
+def _file_ext(name):
+    """从文件名取小写扩展名（rfind 代替 splitext，避免元组分配），无扩展名返回 'no_ext'"""
+    dot = name.rfind('.')
+    if dot <= 0:
+        return 'no_ext'
+    raw = name[dot:]
+    ext = _EXT_INTERN.get(raw)
+    if ext is None:
+        ext = sys.intern(raw.lower())
+        if len(_EXT_INTERN) < _EXT_INTERN_MAX:
+            _EXT_INTERN[raw] = ext
+    return ext
+
+
+# 整个跳过、不进入的目录名（版本库元数据、字节码缓存）；
+# 在目录项层面直接按名字判断，不必对完整路径跑排除正则
+_SKIP_DIR_NAMES = frozenset({'.git', '.svn', '.hg', '__pycache__'})
+
+# 磁盘使用率缓存窗口（秒）
+_DISK_USAGE_TTL = 5
+
+# 超过此大小的文件不整体 mmap，改为分块读取（32 位进程地址空间有限）
+_MMAP_HASH_MAX = 2 * 1024 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=32)
+def _disk_usage_percent(root_path, ttl_bucket):
+    """
+    获取磁盘使用率（跨平台）
+
+    ttl_bucket 只参与缓存键：同一时间窗口内的重复查询直接复用结果，
+    多次构造分析器（批量运行、hybrid 内部的二次扫描）不再重复 statvfs
+    """
+    try:
+        # shutil.disk_usage 在 POSIX 上即 statvfs，在 Windows 上即 GetDiskFreeSpaceExW
+        usage = shutil.disk_usage(root_path)
+        return (usage.used / usage.total) * 100 if usage.total > 0 else 0.0
+    except OSError:
+        return 0.0
+
+
+@functools.lru_cache(maxsize=None)
+def _command_available(name):
+    """系统命令是否可用（每个进程只探测一次）"""
+    try:
+        subprocess.run([name, '--version'], capture_output=True, check=True)
+        return True
+    except:
+        return False
+
+
+def _fadvise(fd, advice_name):
+    """向内核提示读取方式（仅 POSIX；不支持的平台/文件系统直接忽略）"""
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    except OSError:
+        pass
 
 
 class DiskAnalyzer:
     """高性能磁盘分析器，支持实时进度和多模式扫描"""
 
     def __init__(self, root_path, max_depth=2, scan_method='auto',
-                 num_workers=None, use_cache=True, ignore_errors=True):
+                 num_workers=None, use_cache=True, ignore_errors=True,
+                 dedupe_hardlinks=True, one_filesystem=False):
         """
         初始化分析器
 
@@ -28,16 +110,29 @@ class DiskAnalyzer:
             num_workers: 工作线程数
             use_cache: 是否使用缓存
             ignore_errors: 是否忽略权限错误
+            dedupe_hardlinks: 同一文件的多个硬链接是否只统计一次
+            one_filesystem: 只扫描根目录所在的文件系统（不进入 /proc、/sys、网络盘等其他挂载点）
         """
         self.root_path = os.path.abspath(root_path)
         self.max_depth = max_depth
         self.num_workers = num_workers or (os.cpu_count() or 4)
         self.use_cache = use_cache
         self.ignore_errors = ignore_errors
+        self.dedupe_hardlinks = dedupe_hardlinks
+        self.one_filesystem = one_filesystem
 
         # 首先检测平台
         self._detect_platform()
 
+        # 根目录所在设备号；为 None 时不限制文件系统。
+        # Windows 的 scandir 目录项不提供 st_dev，只在 POSIX 上按设备号剪枝
+        self._root_dev = None
+        if one_filesystem and not self.is_windows:
+            try:
+                self._root_dev = os.stat(self.root_path).st_dev
+            except OSError:
+                pass
+
         # 然后确定扫描方法
         self.scan_method = self._determine_method(scan_method)
 
@@ -49,6 +144,11 @@ class DiskAnalyzer:
         }
         self.lock = threading.Lock()
         self.stop_event = None
+        self._progress_dict = dict(self.scan_stats)
+        self._last_emit_ns = 0
+        self._emit_interval_ns = 33_000_000  # 进度回调最多约30次/秒
+        self._progress_flush_files = 1024  # 扫描线程本地累计的文件数达到此值才合并进度
+        self._progress_flush_ns = 100_000_000  # 或距上次合并超过0.1秒
 
         # 数据存储
         self.file_types = collections.defaultdict(int)
@@ -56,15 +156,21 @@ class DiskAnalyzer:
         self.top_n_limit = 50
         self.flat_dirs = []
         self.duplicate_files = collections.defaultdict(list)
+        self.dup_min_size = 1024 * 1024  # 小于1MB的文件不参与查重
+        self.quick_hash_bytes = 64 * 1024  # 快速指纹读取首尾各64KB
+        self._by_size = collections.defaultdict(list)
         self.cleanable_files = []
         self.history_data = []
         self.skipped_paths = []
+        self._seen_inodes = set()
 
         # 缓存
         self.cache_dir = Path.home() / '.cache' / 'disk_analyzer'
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        cache_key = hashlib.md5(self.root_path.encode()).hexdigest()
-        self.cache_file = self.cache_dir / f"scan_{cache_key}.pkl"
+        # 限定文件系统的结果单独缓存，默认扫描沿用原来的缓存键
+        cache_src = self.root_path + ('\0xdev' if one_filesystem else '')
+        cache_key = hashlib.blake2b(cache_src.encode(), digest_size=8).hexdigest()
+        self.cache_file = self.cache_dir / f"scan_{cache_key}.json.gz"
 
         # 编译正则表达式
         self._compile_patterns()
@@ -76,30 +182,19 @@ class DiskAnalyzer:
         """检测平台特性"""
         self.is_windows = os.name == 'nt'
         self.is_linux = os.name == 'posix'
-        self.has_find = False
-        self.has_du = False
 
-        # 检查系统命令可用性（只在Linux下检查）
-        if self.is_linux:
-            try:
-                subprocess.run(['find', '--version'], capture_output=True, check=True)
-                self.has_find = True
-            except:
-                pass
-
-            try:
-                subprocess.run(['du', '--version'], capture_output=True, check=True)
-                self.has_du = True
-            except:
-                pass
+    @property
+    def has_du(self):
+        """du 命令是否可用（只在Linux下检查，首次访问时才探测）"""
+        return self.is_linux and _command_available('du')
 
     def _determine_method(self, method):
         """智能确定扫描方法"""
         if method == 'auto':
             if self.is_windows:
                 return 'fastwalk'  # Windows优化版本
-            elif self.has_find:
-                return 'fastfind'  # Linux快速find版本
+            elif self.is_linux:
+                return 'fastfind'  # Linux快速版本（进程内遍历，不依赖find命令）
             else:
                 return 'walk'
         return method
@@ -116,6 +211,14 @@ class DiskAnalyzer:
             (re.compile(r'thumb\.db$|\.DS_Store$', re.I), '系统缓存'),
         ]
 
+        # 合并成一个正则：每个分支都是从开头起的前向断言，按列表顺序尝试，
+        # 保持"靠前的模式优先"的语义；分支末尾的空命名组标记命中的类型
+        self._cleanable_re = re.compile('|'.join(
+            f'(?=.*?(?:{pattern.pattern}))(?P<c{i}>)'
+            for i, (pattern, _) in enumerate(self.cleanable_patterns)
+        ), re.I | re.S)
+        self._cleanable_types = {f'c{i}': file_type for i, (_, file_type) in enumerate(self.cleanable_patterns)}
+
         # 排除模式
         self.exclude_patterns = [
             re.compile(r'^/proc/'),
@@ -137,12 +240,31 @@ class DiskAnalyzer:
                 re.compile(r'swapfile\.sys$', re.I),
             ])
 
+        # 排除模式同样合并为一个正则，每个路径只做一次 search；
+        # 各模式的忽略大小写标志用局部内联标志保留
+        self._exclude_re = re.compile('|'.join(
+            f'(?i:{pattern.pattern})' if pattern.flags & re.I else f'(?:{pattern.pattern})'
+            for pattern in self.exclude_patterns
+        ))
+        # 只有 Windows 路径需要把反斜杠转换成正斜杠
+        self._path_needs_translate = os.sep == '\\'
+
     def should_skip(self, path):
         """判断是否跳过路径"""
-        for pattern in self.exclude_patterns:
-            if pattern.search(path.replace('\\', '/')):
-                return True
-        return False
+        if self._path_needs_translate:
+            path = path.replace('\\', '/')
+        return self._exclude_re.search(path) is not None
+
+    def _skip_checker(self):
+        """
+        扫描循环里使用的排除判断函数
+
+        POSIX 路径无需转换，直接返回合并正则的 search（命中时返回真值），
+        每个目录项省去一次方法调用
+        """
+        if self._path_needs_translate:
+            return self.should_skip
+        return self._exclude_re.search
 
     def _update_progress(self, files=0, bytes=0, path=None):
         """更新扫描进度"""
@@ -153,6 +275,39 @@ class DiskAnalyzer:
                 if path:
                     self.scan_stats['current_path'] = path
 
+    def _seen_hardlink(self, st):
+        """
+        该文件是否为已统计过的 inode 的另一个硬链接
+
+        只检查 st_nlink > 1 的文件，普通文件不进集合；
+        Windows 上 DirEntry.stat() 的 st_nlink 为 0，自然跳过
+        """
+        if not self.dedupe_hardlinks or st.st_nlink < 2:
+            return False
+        key = (st.st_dev, st.st_ino)
+        with self.lock:
+            if key in self._seen_inodes:
+                return True
+            self._seen_inodes.add(key)
+        return False
+
+    def _emit_progress(self, on_progress, force=False):
+        """
+        节流后的进度回调
+
+        扫描热路径里可能每个目录/批次都会触发，这里限制到约30Hz，
+        并复用同一个字典，避免每次回调都分配新字典
+        """
+        if not on_progress:
+            return
+        now = time.monotonic_ns()
+        if not force and now - self._last_emit_ns < self._emit_interval_ns:
+            return
+        self._last_emit_ns = now
+        with self.lock:
+            self._progress_dict.update(self.scan_stats)
+            on_progress(self._progress_dict)
+
     def _cache_valid(self):
         """检查缓存有效性"""
         if not self.use_cache or not self.cache_file.exists():
@@ -161,55 +316,25 @@ class DiskAnalyzer:
         return cache_age < 600  # 10分钟有效期
 
     def _load_cache(self):
-        """加载缓存"""
+        """加载缓存（gzip 压缩的 JSON，读取时不会像 pickle 那样执行任意代码）"""
         try:
-            with open(self.cache_file, 'rb') as f:
-                return pickle.load(f)
+            with gzip.open(self.cache_file, 'rb') as f:
+                return json.loads(f.read())
         except:
             return None
 
     def _save_cache(self, data):
         """保存缓存"""
         try:
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(data, f)
+            payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            with gzip.open(self.cache_file, 'wb', compresslevel=3) as f:
+                f.write(payload)
         except:
             pass
 
     def _get_disk_usage(self):
-        """获取磁盘使用率（跨平台）"""
-        try:
-            # 尝试使用psutil
-            try:
-                import psutil
-                return psutil.disk_usage(self.root_path).percent
-            except ImportError:
-                pass
-
-            # Linux/Mac使用statvfs
-            if hasattr(os, 'statvfs'):
-                stat = os.statvfs(self.root_path)
-                total = stat.f_blocks * stat.f_frsize
-                free = stat.f_bavail * stat.f_frsize
-                used = total - free
-                return (used / total) * 100 if total > 0 else 0
-
-            # Windows使用ctypes
-            if self.is_windows:
-                import ctypes
-                drive = os.path.splitdrive(self.root_path)[0] + '\\'
-                kernel32 = ctypes.windll.kernel32
-                free_bytes = ctypes.c_ulonglong()
-                total_bytes = ctypes.c_ulonglong()
-
-                if kernel32.GetDiskFreeSpaceExW(drive, None, ctypes.byref(total_bytes), ctypes.byref(free_bytes)):
-                    total = total_bytes.value
-                    used = total - free_bytes.value
-                    return (used / total) * 100 if total > 0 else 0
-
-            return 75.0  # 默认值
-        except:
-            return 0.0
+        """获取磁盘使用率（5秒内的结果直接复用）"""
+        return _disk_usage_percent(self.root_path, int(time.monotonic() // _DISK_USAGE_TTL))
 
     def scan(self, on_progress=None, stop_event=None):
         """
@@ -230,6 +355,7 @@ class DiskAnalyzer:
             cached = self._load_cache()
             if cached:
                 print(f"[缓存] 使用缓存数据")
+                self._last_scan_result = cached
                 return cached
 
         # 根据方法选择扫描策略
@@ -251,16 +377,27 @@ class DiskAnalyzer:
             else:
                 dir_tree = self._scan_fast_walk(on_progress)  # 默认
 
+            # 扫描结束时推送一次最终进度（不受节流限制）
+            self._emit_progress(on_progress, force=True)
+
             # 检查是否被停止
             if self.stop_event.is_set():
                 print("[扫描] 扫描被停止")
-                return self._create_partial_result()
+                self._last_scan_result = self._create_partial_result()
+                return self._last_scan_result
 
             # 后处理
             self._post_process()
 
-            # 构建完整结果
+            # 查重哈希期间也可能被停止（被跳过的文件不会计入重复组）：不完整，不写缓存
+            if self.stop_event.is_set():
+                print("[扫描] 扫描被停止")
+                self._last_scan_result = self._create_partial_result()
+                return self._last_scan_result
+
+            # 构建完整结果，并记录下来供 get_enhanced_summary/get_tui_data 复用
             result = self._build_result(dir_tree)
+            self._last_scan_result = result
 
             # 保存缓存
             if self.use_cache:
@@ -278,261 +415,226 @@ class DiskAnalyzer:
             traceback.print_exc()
             return self._create_error_result(str(e))
 
-    def _scan_fast_find(self, on_progress=None):
-        """使用find命令快速扫描（Linux优化版）"""
-        if not self.has_find:
-            return self._scan_walk(on_progress)
+    def _collect_files(self, path, files_out, subdirs_out, descend=True, skip_hidden=False):
+        """
+        扫描单个目录（各扫描方法共用的热路径）
 
-        files = []
-        dir_sizes = collections.defaultdict(int)
+        文件以 (path, size, ext) 元组追加到 files_out，需要继续进入的子目录追加到 subdirs_out；
+        类型来自 scandir 目录项，大小只 stat 一次，不跟随符号链接
 
+        Returns:
+            本目录新增文件的总字节数
+        """
+        skip = self._skip_checker()
+        root_dev = self._root_dev
+        nbytes = 0
         try:
-            # 构建优化的find命令
-            cmd = [
-                'find', self.root_path,
-                '-type', 'f',
-                '!', '-path', '*/.*',  # 跳过隐藏文件
-                '-printf', '%p\t%s\t%T@\n'
-            ]
-
-            print(f"[find] 执行命令: {' '.join(cmd[:5])}...")
-
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.DEVNULL,
-                text=True,
-                bufsize=8192
-            )
-
-            file_count = 0
-            batch_size = 1000
-            batch_files = []
-
-            for line in process.stdout:
-                if self.stop_event.is_set():
-                    process.terminate()
-                    break
-
-                if not line.strip():
-                    continue
+            with os.scandir(path) as it:
+                for entry in it:
+                    name = entry.name
+                    if skip_hidden and name[0] == '.':
+                        continue
 
-                try:
-                    path, size_str, mtime_str = line.strip().split('\t')
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if descend and name not in _SKIP_DIR_NAMES and not skip(entry.path):
+                                # 挂载点的设备号与根目录不同，整棵子树直接剪掉
+                                if root_dev is None or entry.stat(follow_symlinks=False).st_dev == root_dev:
+                                    subdirs_out.append(entry.path)
+                            continue
 
-                    # 跳过排除路径
-                    if self.should_skip(path):
-                        continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
 
-                    size = int(size_str)
-                    batch_files.append({
-                        'path': path,
-                        'size': size,
-                        'mtime': float(mtime_str)
-                    })
-
-                    # 更新进度
-                    file_count += 1
-                    if file_count % batch_size == 0:
-                        self._update_progress(batch_size, sum(f['size'] for f in batch_files), path)
-                        if on_progress:
-                            with self.lock:
-                                on_progress(dict(self.scan_stats))
-
-                        # 批量处理
-                        self._process_batch_fast(batch_files, dir_sizes)
-                        batch_files = []
-
-                except ValueError:
-                    continue
+                        full_path = entry.path
+                        if skip(full_path):
+                            continue
 
-            # 处理剩余文件
-            if batch_files:
-                self._process_batch_fast(batch_files, dir_sizes)
+                        st = entry.stat(follow_symlinks=False)
+                        if self._seen_hardlink(st):
+                            continue
 
-            process.wait()
+                        size = st.st_size
+                        files_out.append((full_path, size, _file_ext(name)))
+                        nbytes += size
+                    except OSError:
+                        continue
+        except OSError:
+            pass
 
-            return self._build_tree_from_dirs(dir_sizes)
+        return nbytes
 
-        except Exception as e:
-            print(f"[find] 命令失败: {e}")
-            return self._scan_walk(on_progress)
+    def _scan_fast_find(self, on_progress=None):
+        """
+        进程内快速扫描（Linux默认）：不限深度，跳过隐藏文件和目录
 
-    def _scan_fast_walk(self, on_progress=None):
-        """快速walk扫描"""
+        原先启动 find 子进程再逐行解析 "路径\t大小" 文本；现在直接用 scandir 遍历，
+        省去 fork/exec、管道传输以及每行的 strip/split/int
+        """
         dir_sizes = collections.defaultdict(int)
-        all_files = []
+        batch_size = 4096
+        batch_files = []
+        batch_bytes = 0
 
-        # Windows上使用简单并行，避免ProcessPoolExecutor问题
-        if self.is_windows:
-            return self._scan_walk(on_progress)
+        stack = [self.root_path]
+        while stack:
+            if self.stop_event.is_set():
+                break
 
-        # Linux/Mac使用进程池
-        try:
-            from concurrent.futures import ProcessPoolExecutor
-            import multiprocessing
+            path = stack.pop()
+            # 跳过隐藏文件和目录（等同于原 find 的 ! -path '*/.*'）
+            batch_bytes += self._collect_files(path, batch_files, stack, skip_hidden=True)
 
-            first_level_dirs = []
-            with os.scandir(self.root_path) as it:
-                for entry in it:
-                    if entry.is_dir() and not entry.is_symlink():
-                        if not self.should_skip(entry.path):
-                            first_level_dirs.append(entry.path)
+            # 批量处理并更新进度
+            if len(batch_files) >= batch_size:
+                self._update_progress(len(batch_files), batch_bytes, path)
+                self._emit_progress(on_progress)
+                self._process_batch_fast(batch_files, dir_sizes)
+                batch_files = []
+                batch_bytes = 0
 
-            print(f"[fastwalk] 发现 {len(first_level_dirs)} 个一级目录")
+        # 处理剩余文件
+        if batch_files:
+            self._update_progress(len(batch_files), batch_bytes)
+            self._process_batch_fast(batch_files, dir_sizes)
 
-            # 限制并发数
-            max_workers = min(self.num_workers, len(first_level_dirs), 8)
+        return self._build_tree_from_dirs(dir_sizes)
 
-            with ProcessPoolExecutor(max_workers=max_workers) as executor:
-                futures = {}
-                for dir_path in first_level_dirs[:50]:  # 限制最多50个目录
-                    future = executor.submit(self._scan_single_dir, dir_path, self.max_depth - 1)
-                    futures[future] = dir_path
+    def _scan_fast_walk(self, on_progress=None):
+        """
+        快速walk扫描：多线程共享目录队列
+
+        所有线程从同一个待扫描目录队列取任务，扫描出的子目录放回队列，
+        空闲线程随时接手任意子树的目录，单个巨大的一级目录不会只压在一个线程上；
+        scandir/stat 在系统调用期间释放 GIL，线程间也无需 pickle 分析器实例
+        """
+        dir_sizes = collections.defaultdict(int)
+        all_files = []
 
-                completed = 0
-                for future in as_completed(futures):
-                    if self.stop_event.is_set():
-                        executor.shutdown(wait=False, cancel_futures=True)
+        # 队列元素：(目录, 深度)
+        tasks = [(self.root_path, 0)]
+        cond = threading.Condition()
+        busy = [0]  # 正在扫描目录的线程数；队列为空且无线程忙碌时扫描结束
+        flush_files = self._progress_flush_files
+        flush_ns = self._progress_flush_ns
+        stop_event = self.stop_event
+        max_depth = self.max_depth
+
+        def flush(files, nbytes, path):
+            """把线程本地的结果合并到共享结构"""
+            with self.lock:
+                all_files.extend(files)
+                self.scan_stats['scanned_files'] += len(files)
+                self.scan_stats['scanned_bytes'] += nbytes
+                self.scan_stats['current_path'] = path
+
+        def worker():
+            files = []
+            nbytes = 0
+            path = self.root_path
+            last_flush = time.monotonic_ns()
+
+            while True:
+                with cond:
+                    while not tasks and busy[0] and not stop_event.is_set():
+                        cond.wait(0.1)
+                    if not tasks or stop_event.is_set():
+                        cond.notify_all()
                         break
+                    path, depth = tasks.pop()
+                    busy[0] += 1
 
-                    dir_path = futures[future]
-                    try:
-                        dir_files, dir_size = future.result(timeout=30)
-                        all_files.extend(dir_files)
-                        dir_sizes[dir_path] = dir_size
+                subdirs = []
+                try:
+                    nbytes += self._collect_files(path, files, subdirs, descend=depth < max_depth)
+                finally:
+                    # 出异常也要归还 busy 计数，否则其余线程一直等待，扫描卡死而走不到回退逻辑
+                    with cond:
+                        tasks.extend((subdir, depth + 1) for subdir in subdirs)
+                        busy[0] -= 1
+                        cond.notify_all()
+
+                # 本地攒够一批（或超过0.1秒）再加锁合并，避免每个文件都争用 self.lock
+                now = time.monotonic_ns()
+                if len(files) >= flush_files or (files and now - last_flush >= flush_ns):
+                    flush(files, nbytes, path)
+                    files = []
+                    nbytes = 0
+                    last_flush = now
+
+            if files:
+                flush(files, nbytes, path)
 
-                        # 更新进度
-                        self._update_progress(len(dir_files), dir_size, dir_path)
-                        if on_progress:
-                            with self.lock:
-                                on_progress(dict(self.scan_stats))
+        try:
+            num_workers = max(1, self.num_workers)
+            print(f"[fastwalk] 启动 {num_workers} 个扫描线程")
+
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(worker) for _ in range(num_workers)]
 
-                        completed += 1
-                        if completed % 5 == 0:
-                            print(f"[进度] 完成 {completed}/{len(futures)} 个目录")
+                # 当前线程只负责推送进度
+                pending = futures
+                while pending:
+                    _, pending = wait(pending, timeout=0.05)
+                    self._emit_progress(on_progress)
 
-                    except Exception as e:
-                        print(f"[错误] 扫描目录 {dir_path} 失败: {e}")
+                for future in futures:
+                    future.result()
 
         except Exception as e:
             print(f"[fastwalk] 并行扫描失败，回退到普通walk: {e}")
+            # 失败的这一轮已记下的硬链接 inode 和已合并的进度都要清掉，
+            # 否则 walk 会把这些 inode 当作已统计而永久跳过，文件数/字节数也会重复累计
+            with self.lock:
+                self._seen_inodes.clear()
+                self.scan_stats['scanned_files'] = 0
+                self.scan_stats['scanned_bytes'] = 0
+                self.scan_stats['current_path'] = self.root_path
             return self._scan_walk(on_progress)
 
-        # 扫描根目录文件
-        try:
-            with os.scandir(self.root_path) as it:
-                for entry in it:
-                    if self.stop_event.is_set():
-                        break
-
-                    if entry.is_file() and not entry.is_symlink():
-                        if not self.should_skip(entry.path):
-                            try:
-                                size = entry.stat().st_size
-                                all_files.append({
-                                    'path': entry.path,
-                                    'size': size,
-                                    'ext': os.path.splitext(entry.name)[1].lower() or 'no_ext'
-                                })
-                                dir_sizes[self.root_path] += size
-                                self._update_progress(1, size, entry.path)
-                            except:
-                                pass
-        except:
-            pass
-
         # 处理所有文件
         self._process_batch_fast(all_files, dir_sizes)
 
         return self._build_tree_from_dirs(dir_sizes)
 
-    def _scan_single_dir(self, dir_path, max_depth):
-        """扫描单个目录（用于并行）"""
-        dir_files = []
-        dir_size = 0
-
-        try:
-            for root, dirs, files in os.walk(dir_path):
-                # 检查深度
-                current_depth = root[len(dir_path):].count(os.sep)
-                if current_depth > max_depth:
-                    del dirs[:]
-                    continue
-
-                # 跳过排除目录
-                dirs[:] = [d for d in dirs if not self.should_skip(os.path.join(root, d))]
-
-                for file in files:
-                    try:
-                        full_path = os.path.join(root, file)
-                        if self.should_skip(full_path):
-                            continue
-
-                        size = os.path.getsize(full_path)
-                        dir_files.append({
-                            'path': full_path,
-                            'size': size,
-                            'ext': os.path.splitext(file)[1].lower() or 'no_ext'
-                        })
-                        dir_size += size
-                    except:
-                        continue
-
-        except Exception:
-            pass
-
-        return dir_files, dir_size
-
     def _scan_walk(self, on_progress=None):
         """传统walk扫描（兼容性好）"""
         dir_sizes = collections.defaultdict(int)
         all_files = []
 
         try:
-            for root, dirs, files in os.walk(self.root_path, followlinks=False):
+            # 显式栈 + scandir：文件类型来自目录项，大小只 stat 一次，
+            # 不再像 os.walk + os.stat 那样对每个文件重新解析完整路径
+            stack = [(self.root_path, 0)]
+            pending_files = pending_bytes = 0
+            last_flush = 0
+            while stack:
                 if self.stop_event.is_set():
                     break
 
-                # 更新当前路径
-                self._update_progress(0, 0, root)
-                if on_progress:
-                    with self.lock:
-                        on_progress(dict(self.scan_stats))
+                root, current_depth = stack.pop()
 
-                # 控制深度
-                current_depth = root[len(self.root_path):].count(os.sep)
-                if current_depth > self.max_depth:
-                    del dirs[:]
-                    continue
+                # 进度先在本地累加，攒够一批或超过0.1秒才加锁合并一次
+                now = time.monotonic_ns()
+                if pending_files >= self._progress_flush_files or now - last_flush >= self._progress_flush_ns:
+                    self._update_progress(pending_files, pending_bytes, root)
+                    self._emit_progress(on_progress)
+                    pending_files = pending_bytes = 0
+                    last_flush = now
 
-                # 跳过排除目录
-                dirs[:] = [d for d in dirs if not self.should_skip(os.path.join(root, d))]
+                subdirs = []
+                count = len(all_files)
+                pending_bytes += self._collect_files(root, all_files, subdirs,
+                                                     descend=current_depth < self.max_depth)
+                pending_files += len(all_files) - count
 
-                # 处理文件
-                for file in files:
-                    try:
-                        full_path = os.path.join(root, file)
-                        if self.should_skip(full_path):
-                            continue
-
-                        size = os.path.getsize(full_path)
-                        all_files.append({
-                            'path': full_path,
-                            'size': size,
-                            'ext': os.path.splitext(file)[1].lower() or 'no_ext'
-                        })
-                        dir_sizes[root] += size
-                        dir_sizes[self.root_path] += size
-
-                        # 更新进度
-                        self._update_progress(1, size, full_path)
-
-                    except (PermissionError, OSError):
-                        continue
+                # 控制深度：到达最大深度的目录不再收集子目录，更深一层不会被列出
+                stack.extend((subdir, current_depth + 1) for subdir in subdirs)
 
         except Exception as e:
             print(f"[walk] 扫描出错: {e}")
+        finally:
+            self._update_progress(pending_files, pending_bytes)
 
         # 批量处理文件
         self._process_batch_fast(all_files, dir_sizes)
@@ -546,7 +648,8 @@ class DiskAnalyzer:
                 # Windows使用dir命令
                 cmd = f'cmd /c "dir /s /a-d "{self.root_path}" 2>nul"'
             else:
-                cmd = f'du -sb "{self.root_path}" 2>/dev/null'
+                du_flags = '-sbx' if self.one_filesystem else '-sb'
+                cmd = f'du {du_flags} "{self.root_path}" 2>/dev/null'
 
             result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
 
@@ -608,7 +711,9 @@ class DiskAnalyzer:
             scan_method='walk',
             num_workers=self.num_workers,
             use_cache=False,
-            ignore_errors=self.ignore_errors
+            ignore_errors=self.ignore_errors,
+            dedupe_hardlinks=self.dedupe_hardlinks,
+            one_filesystem=self.one_filesystem
         )
 
         detailed_tree = backup_analyzer._scan_walk(on_progress)
@@ -625,45 +730,64 @@ class DiskAnalyzer:
         return base_tree
 
     def _process_batch_fast(self, files, dir_sizes):
-        """快速处理一批文件"""
-        for file_info in files:
-            # 文件类型统计
-            ext = file_info.get('ext', 'no_ext')
-            if not ext:
-                ext = os.path.splitext(file_info['path'])[1].lower() or 'no_ext'
-            self.file_types[ext] += file_info['size']
+        """
+        快速处理一批文件
 
-            # Top文件维护
-            size = file_info['size']
-            path = file_info['path']
+        类型统计、Top文件、查重分桶、可清理识别、目录大小合并在同一个循环里完成，
+        循环内只访问局部变量，不再为每个文件调用辅助方法
+        """
+        # 文件类型先在局部字典累加，批次结束后一次性合并
+        types_local = {}
+
+        top_files = self.top_files
+        top_n_limit = self.top_n_limit
+        heappush = heapq.heappush
+        heapreplace = heapq.heapreplace
+        # 堆未满时任何文件都能进入；满了之后阈值为堆顶（当前第N大）
+        top_min = top_files[0][0] if len(top_files) >= top_n_limit else -1
+        by_size = self._by_size
+        dup_min_size = self.dup_min_size
+        cleanable_match = self._cleanable_re.match
+        cleanable_types = self._cleanable_types
+        cleanable_append = self.cleanable_files.append
+        sep = os.sep
+
+        # files 中每项为 (path, size, ext) 元组，扫描热路径上不再为每个文件分配字典
+        for path, size, ext in files:
+            # 文件类型统计
+            types_local[ext] = types_local.get(ext, 0) + size
+
+            # Top文件维护：绝大多数文件小于当前第N大，只比较一次局部阈值
+            if size > top_min:
+                if len(top_files) < top_n_limit:
+                    heappush(top_files, (size, path))
+                    if len(top_files) == top_n_limit:
+                        top_min = top_files[0][0]
+                else:
+                    heapreplace(top_files, (size, path))
+                    top_min = top_files[0][0]
 
-            if len(self.top_files) < self.top_n_limit:
-                heapq.heappush(self.top_files, (size, path))
-            elif size > self.top_files[0][0]:
-                heapq.heapreplace(self.top_files, (size, path))
+            # 按大小分桶，供扫描结束后查重（扫描过程中不读文件内容）
+            if size >= dup_min_size:
+                by_size[size].append(path)
 
             # 识别可清理文件
-            self._identify_cleanable_file_fast(file_info)
+            m = cleanable_match(path)
+            if m:
+                cleanable_append({
+                    'path': path,
+                    'size': size,
+                    'type': cleanable_types[m.lastgroup]
+                })
 
-            # 更新目录大小
-            dir_path = os.path.dirname(path)
+            # 更新目录大小：只记文件所在目录自身的直接文件，子树和根目录的汇总在建树时完成
+            # 路径都由 scandir 以 os.sep 拼接而成，直接切片取父目录，无需 os.path.dirname 的规范化
+            dir_path = path[:path.rfind(sep)]
             dir_sizes[dir_path] = dir_sizes.get(dir_path, 0) + size
 
-            # 更新根目录大小
-            dir_sizes[self.root_path] = dir_sizes.get(self.root_path, 0) + size
-
-    def _identify_cleanable_file_fast(self, file_info):
-        """快速识别可清理文件"""
-        path_lower = file_info['path'].lower()
-
-        for pattern, file_type in self.cleanable_patterns:
-            if pattern.search(path_lower):
-                self.cleanable_files.append({
-                    'path': file_info['path'],
-                    'size': file_info['size'],
-                    'type': file_type
-                })
-                break
+        file_types = self.file_types
+        for ext, size in types_local.items():
+            file_types[ext] += size
 
     def _build_tree_from_dirs(self, dir_sizes):
         """从目录大小构建树"""
@@ -676,50 +800,151 @@ class DiskAnalyzer:
                 'percentage': 100
             }
 
+        # dir_sizes 中每个目录只记录其直接文件的大小：
+        # 根目录大小为全部之和，每个一级子目录为其整棵子树之和（按目录而非按文件汇总）
+        root_path = self.root_path
+        sep = os.sep
+        prefix = root_path if root_path.endswith(sep) else root_path + sep
+        prefix_len = len(prefix)
+
+        root_size = 0
+        child_dirs = collections.defaultdict(int)
+        for dir_path, size in dir_sizes.items():
+            root_size += size
+            if dir_path == root_path or not dir_path.startswith(prefix):
+                continue
+
+            end = dir_path.find(sep, prefix_len)
+            child_dirs[dir_path if end < 0 else dir_path[:end]] += size
+
         # 构建树结构
-        root_size = dir_sizes.get(self.root_path, 0)
         root_tree = {
-            'path': self.root_path,
-            'name': os.path.basename(self.root_path),
+            'path': root_path,
+            'name': os.path.basename(root_path),
             'size': root_size,
             'children': [],
             'percentage': 100
         }
 
-        # 添加直接子目录
-        child_dirs = {}
-        for dir_path, size in dir_sizes.items():
-            if dir_path == self.root_path:
-                continue
-
-            parent = os.path.dirname(dir_path)
-            if parent == self.root_path:
-                child_dirs[dir_path] = size
-
-        # 按大小排序并添加
-        for dir_path, size in sorted(child_dirs.items(), key=lambda x: x[1], reverse=True)[:100]:
+        # 只取最大的100个：nlargest 单次遍历，无需对全部子目录排序
+        inv_root = 100.0 / root_size if root_size > 0 else 0.0
+        for dir_path, size in heapq.nlargest(100, child_dirs.items(), key=itemgetter(1)):
             root_tree['children'].append({
                 'path': dir_path,
                 'name': os.path.basename(dir_path),
                 'size': size,
                 'children': [],
-                'percentage': (size / root_size * 100) if root_size > 0 else 0
+                'percentage': size * inv_root
             })
 
         return root_tree
 
     def _post_process(self):
         """后处理数据"""
-        # 转换top_files为排序列表
-        self.top_files = sorted(self.top_files, reverse=True)
-
         # 限制cleanable_files数量
         if len(self.cleanable_files) > 200:
             self.cleanable_files = self.cleanable_files[:200]
 
+        # 重复文件检测
+        self._process_duplicates()
+
         # 生成模拟历史数据
         self._generate_mock_history()
 
+    def _quick_hash(self, path, size):
+        """快速指纹：文件首尾各 quick_hash_bytes 字节 + 文件大小"""
+        block = self.quick_hash_bytes
+        hasher = _quick_hasher() if _quick_hasher is not None else hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            hasher.update(f.read(block))
+            if size > block:
+                f.seek(max(size - block, block))
+                hasher.update(f.read(block))
+        hasher.update(str(size).encode())
+        return hasher.hexdigest()
+
+    def _full_hash(self, path):
+        """完整文件哈希（mmap 一次交给 hashlib，超大文件或 mmap 失败时分块读取）"""
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            fd = f.fileno()
+            # 顺序读取，提示内核加大预读；读完丢弃这些页，避免挤掉其他进程的页缓存
+            _fadvise(fd, 'POSIX_FADV_SEQUENTIAL')
+            try:
+                size = os.fstat(fd).st_size
+                if 0 < size <= _MMAP_HASH_MAX:
+                    try:
+                        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                            hasher.update(mm)
+                        return hasher.hexdigest()
+                    except (OSError, ValueError):
+                        hasher = hashlib.blake2b(digest_size=16)
+                        f.seek(0)
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    hasher.update(chunk)
+            finally:
+                _fadvise(fd, 'POSIX_FADV_DONTNEED')
+        return hasher.hexdigest()
+
+    def _process_duplicates(self):
+        """
+        重复文件检测：大小分桶 -> 快速指纹 -> 完整哈希
+
+        只有大小相同的文件才可能重复，绝大多数文件在第一步就被排除，
+        只有快速指纹仍然相同的文件才需要读取全部内容；
+        两轮哈希都交给线程池并行（读文件和 hashlib 计算期间都会释放 GIL）
+        """
+        self.duplicate_files = collections.defaultdict(list)
+        stop_event = self.stop_event
+
+        def safe_hash(func, *args):
+            if stop_event is not None and stop_event.is_set():
+                return None
+            try:
+                return func(*args)
+            except OSError:
+                return None
+
+        candidates = [(size, path) for size, paths in self._by_size.items() if len(paths) > 1 for path in paths]
+        # 分桶只在查重时需要，取出候选后立即释放（大目录树下这里保存着大量路径）
+        self._by_size = collections.defaultdict(list)
+        if not candidates:
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.num_workers, 8))) as executor:
+            # 第一轮：快速指纹（指纹中已包含文件大小）
+            quick_groups = collections.defaultdict(list)
+            quick_digests = executor.map(lambda item: safe_hash(self._quick_hash, item[1], item[0]), candidates)
+            for (size, path), quick in zip(candidates, quick_digests):
+                if quick is not None:
+                    quick_groups[quick].append((size, path))
+
+            # 文件不超过首尾两段时，快速指纹已覆盖全部内容，无需再读
+            full_candidates = []
+            for quick, group in quick_groups.items():
+                if len(group) < 2:
+                    continue
+                size = group[0][0]
+                if size <= 2 * self.quick_hash_bytes:
+                    self.duplicate_files[quick] = [{'path': p, 'size': size} for _, p in group]
+                else:
+                    full_candidates.extend(group)
+
+            # 已被停止：第一轮剩余的文件都没算指纹，结果不完整（scan() 会丢弃），不再读取全部内容
+            if stop_event is not None and stop_event.is_set():
+                return
+
+            # 第二轮：完整哈希
+            full_groups = collections.defaultdict(list)
+            full_digests = executor.map(lambda item: safe_hash(self._full_hash, item[1]), full_candidates)
+            for (size, path), digest in zip(full_candidates, full_digests):
+                if digest is not None:
+                    full_groups[digest].append((size, path))
+
+        for digest, group in full_groups.items():
+            if len(group) > 1:
+                self.duplicate_files[digest] = [{'path': p, 'size': size} for size, p in group]
+
     def _generate_mock_history(self):
         """生成模拟历史数据"""
         now = datetime.datetime.now()
@@ -742,9 +967,10 @@ class DiskAnalyzer:
         total_size = dir_tree.get('size', 0)
 
         # 扁平目录统计
+        inv_total = 100.0 / total_size if total_size > 0 else 0.0
         flat_dirs = []
         for dir_info in dir_tree.get('children', []):
-            percentage = (dir_info['size'] / total_size * 100) if total_size > 0 else 0
+            percentage = dir_info['size'] * inv_total
             flat_dirs.append({
                 'path': dir_info['path'],
                 'size': dir_info['size'],
@@ -780,20 +1006,24 @@ class DiskAnalyzer:
             'path': self.root_path,
             'total_size': total_size,
             'dir_tree': dir_tree,
-            'flat_dirs': sorted(flat_dirs, key=lambda x: x['size'], reverse=True)[:100],
+            'flat_dirs': flat_dirs,  # dir_tree 的子目录已按大小降序且不超过100个
             'file_types': dict(self.file_types),
             'duplicate_files': dict(self.duplicate_files),
             'cleanable_files': self.cleanable_files[:100],
             'security_suggestions': security_suggestions,
             'history_data': self.history_data,
             'disk_usage': disk_usage,
-            'top_files': [{'path': p, 'size': s} for s, p in self.top_files[:50]],
+            'top_files': self._top_files_view(),
             'scan_stats': dict(self.scan_stats),
             'scan_time': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
 
         return result
 
+    def _top_files_view(self):
+        """top_files 在扫描期间保持为最小堆，只在输出时排序一次"""
+        return [{'path': p, 'size': s} for s, p in sorted(self.top_files, reverse=True)]
+
     def _create_partial_result(self):
         """创建部分扫描结果"""
         return {
@@ -813,7 +1043,7 @@ class DiskAnalyzer:
             'security_suggestions': [],
             'history_data': [],
             'disk_usage': self._get_disk_usage(),
-            'top_files': [{'path': p, 'size': s} for s, p in self.top_files],
+            'top_files': self._top_files_view(),
             'partial': True,
             'scan_stats': dict(self.scan_stats)
         }
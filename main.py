@@ -1,9 +1,13 @@
 import argparse
+import math
 import os
+import shutil
+import signal
 import sys
 import threading
 import time
 from datetime import datetime
+from functools import lru_cache
 
 from analyzer import DiskAnalyzer
 from reporter import EnhancedHTMLReporter
@@ -18,13 +22,15 @@ except ImportError as e:
     TUI_AVAILABLE = False
 
 
-    # 提供简单的format_size函数
+    # 提供简单的format_size函数（与 tui.format_size 一致）
+    @lru_cache(maxsize=4096)
     def format_size(size):
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024:
-                return f"{size:.2f} {unit}"
-            size /= 1024
-        return f"{size:.2f} PB"
+        if size < 1024:
+            return f"{size:.2f} B"
+        if isinstance(size, float) and not math.isfinite(size):
+            return f"{size:.2f} PB"  # inf/nan：与原循环一致
+        unit = min((int(size).bit_length() - 1) // 10, 5)
+        return f"{size / (1 << (10 * unit)):.2f} {('B', 'KB', 'MB', 'GB', 'TB', 'PB')[unit]}"
 
 
 # 跨平台输入处理
@@ -57,17 +63,21 @@ class _RawStdin:
 
 
 # 跨平台非阻塞键盘读取
-def _read_key_nonblocking():
-    """跨平台非阻塞键盘读取"""
+def _read_key_nonblocking(timeout=0):
+    """跨平台键盘读取：最多等待 timeout 秒，无按键返回 None"""
     if not sys.stdin.isatty():
+        if timeout > 0:
+            time.sleep(timeout)
         return None
 
     try:
         if os.name == 'posix':  # Linux/Mac
             import select
-            rlist, _, _ = select.select([sys.stdin], [], [], 0)
+            # 阻塞在 select 上直到有按键或超时，不再 sleep + 轮询
+            rlist, _, _ = select.select([sys.stdin], [], [], timeout)
             if rlist:
                 return sys.stdin.read(1)
+            return None
         elif os.name == 'nt':  # Windows
             import msvcrt
             if msvcrt.kbhit():
@@ -75,23 +85,79 @@ def _read_key_nonblocking():
     except:
         pass
 
+    if timeout > 0:
+        time.sleep(timeout)
     return None
 
 
+# 清行前缀（预先编码，重绘时直接写字节流）
+_CLEAR = b"\r\x1b[2K"
+
+# 终端宽度缓存：[宽度, 读取时间, 是否由 SIGWINCH 负责失效]
+_term_width_cache = [None, 0.0, False]
+
+
 def _terminal_width(default=80):
-    """获取终端宽度"""
+    """获取终端宽度（缓存结果：有 SIGWINCH 时只在窗口变化后重读，否则每秒重读一次）"""
+    width, ts, by_signal = _term_width_cache
+    now = time.monotonic()
+    if width is None or (not by_signal and now - ts >= 1.0):
+        try:
+            width = os.get_terminal_size().columns
+        except:
+            width = default
+        _term_width_cache[0] = width
+        _term_width_cache[1] = now
+    return width
+
+
+def _on_winch(signum, frame):
+    _term_width_cache[0] = None
+
+
+# _watch_terminal_resize 未安装处理函数时的返回值（原处理函数本身可能就是 None）
+_WINCH_NOT_INSTALLED = object()
+
+
+def _watch_terminal_resize():
+    """安装 SIGWINCH 处理，返回原处理函数（不支持时返回 _WINCH_NOT_INSTALLED）"""
     try:
-        return os.get_terminal_size().columns
+        prev = signal.signal(signal.SIGWINCH, _on_winch)
+    except (AttributeError, ValueError):
+        # Windows 没有 SIGWINCH；非主线程不能安装信号处理
+        return _WINCH_NOT_INSTALLED
+    _term_width_cache[0] = None
+    _term_width_cache[2] = True
+    return prev
+
+
+def _unwatch_terminal_resize(prev):
+    """恢复原 SIGWINCH 处理（curses 需要默认处理才能自己响应窗口变化）"""
+    if prev is _WINCH_NOT_INSTALLED:
+        return
+    _term_width_cache[2] = False
+    try:
+        # 原处理函数不是由 Python 安装的（signal.signal 返回 None）时恢复为默认处理
+        signal.signal(signal.SIGWINCH, signal.SIG_DFL if prev is None else prev)
     except:
-        return default
+        pass
 
 
-def _print_scan_progress_line(stats, stopped=False):
-    """打印扫描进度行"""
-    cur = stats.get("current_path") or ""
+class _StatSlot:
+    """单槽进度快照（只存一个不可变元组）"""
+    __slots__ = ('snap',)
+
+    def __init__(self, snap):
+        self.snap = snap
+
+
+def _print_scan_progress_line(snap, stopped=False):
+    """打印扫描进度行，snap 为 (文件数, 字节数, 当前路径)"""
+    files, nbytes, cur = snap
+    cur = cur or ""
     term_width = _terminal_width()
 
-    left = f"扫描中... 文件数={stats.get('scanned_files', 0)}  大小={format_size(stats.get('scanned_bytes', 0))}"
+    left = f"扫描中... 文件数={files}  大小={format_size(nbytes)}"
     hint = "  [q] 停止" if not stopped else "  正在停止..."
 
     # 计算可用空间
@@ -105,12 +171,18 @@ def _print_scan_progress_line(stats, stopped=False):
     if len(line) >= term_width:
         line = line[:max(0, term_width - 1)]
 
-    # 清行并输出
-    sys.stdout.write("\r\033[2K" + line)
-    sys.stdout.flush()
+    # 清行并输出：可用时直接写底层字节流，跳过文本层
+    out = getattr(sys.stdout, 'buffer', None)
+    if out is None:
+        sys.stdout.write("\r\033[2K" + line)
+        sys.stdout.flush()
+        return
+    sys.stdout.flush()  # 先排空文本层里其他线程 print 的内容，保证输出顺序
+    out.write(_CLEAR + line.encode(sys.stdout.encoding or 'utf-8', errors='replace'))
+    out.flush()
 
 
-def run_scan_with_live_progress(path, depth, method='auto', workers=4, use_cache=True):
+def run_scan_with_live_progress(path, depth, method='auto', workers=4, use_cache=True, one_filesystem=False):
     """
     带实时进度条的扫描
 
@@ -120,6 +192,7 @@ def run_scan_with_live_progress(path, depth, method='auto', workers=4, use_cache
         method: 扫描方法
         workers: 工作线程数
         use_cache: 是否使用缓存
+        one_filesystem: 是否只扫描目标所在的文件系统
     """
     print(f"[准备] 开始扫描: {os.path.abspath(path)}")
     print(f"[配置] 方法: {method}, 深度: {depth}, 线程: {workers}")
@@ -130,21 +203,18 @@ def run_scan_with_live_progress(path, depth, method='auto', workers=4, use_cache
         scan_method=method,
         num_workers=workers,
         use_cache=use_cache,
-        ignore_errors=True
+        ignore_errors=True,
+        one_filesystem=one_filesystem
     )
 
     stop_event = threading.Event()
-    latest_stats = {
-        "scanned_files": 0,
-        "scanned_bytes": 0,
-        "current_path": os.path.abspath(path),
-    }
-    lock = threading.Lock()
+    # 最新进度快照：扫描线程整体替换成新元组（属性赋值在 GIL 下是原子的），
+    # 显示循环直接读取，不需要加锁也不需要复制字典
+    slot = _StatSlot((0, 0, os.path.abspath(path)))
 
     def on_progress(stats):
         """进度回调函数"""
-        with lock:
-            latest_stats.update(stats)
+        slot.snap = (stats.get('scanned_files', 0), stats.get('scanned_bytes', 0), stats.get('current_path'))
 
     result_holder = {"tree": None, "error": None}
 
@@ -161,37 +231,43 @@ def run_scan_with_live_progress(path, depth, method='auto', workers=4, use_cache
     t = threading.Thread(target=worker, daemon=True)
     t.start()
 
-    with _RawStdin():
-        last_draw = 0.0
-        print("[进度] 开始显示进度...")
-
-        while t.is_alive():
-            now = time.time()
-            if now - last_draw >= 0.2:  # 降低刷新频率
-                with lock:
-                    stats = dict(latest_stats)
-                _print_scan_progress_line(stats, stopped=stop_event.is_set())
-                last_draw = now
-
-            # 检查键盘输入
-            key = _read_key_nonblocking()
-            if key and key.lower() == 'q':
-                print("\n[操作] 用户请求停止扫描...")
-                stop_event.set()
-
-            time.sleep(0.05)  # 降低CPU使用率
+    prev_winch = _watch_terminal_resize()
+    try:
+        with _RawStdin():
+            last_draw = 0.0
+            last_shown = None
+            print("[进度] 开始显示进度...")
+
+            while t.is_alive():
+                now = time.time()
+                if now - last_draw >= 0.2:  # 降低刷新频率
+                    snap = slot.snap
+                    stopped = stop_event.is_set()
+                    # 进度没有变化时不重绘（大目录 stat 阻塞、扫描收尾查重时常见）
+                    shown = (snap, stopped)
+                    if shown != last_shown:
+                        _print_scan_progress_line(snap, stopped=stopped)
+                        last_shown = shown
+                    last_draw = now
+
+                # 等待键盘输入，最长等到下一次重绘时间点
+                key = _read_key_nonblocking(max(0.0, last_draw + 0.2 - time.time()))
+                if key and key.lower() == 'q':
+                    print("\n[操作] 用户请求停止扫描...")
+                    stop_event.set()
+    finally:
+        _unwatch_terminal_resize(prev_winch)
 
     # 最终更新显示
-    with lock:
-        stats = dict(latest_stats)
-    _print_scan_progress_line(stats, stopped=stop_event.is_set())
+    snap = slot.snap
+    _print_scan_progress_line(snap, stopped=stop_event.is_set())
     sys.stdout.write("\n")
     sys.stdout.flush()
 
     if result_holder["error"] is not None:
         raise result_holder["error"]
 
-    print(f"[完成] 扫描结束，文件数: {stats['scanned_files']}")
+    print(f"[完成] 扫描结束，文件数: {snap[0]}")
     return analyzer, result_holder["tree"], stop_event.is_set()
 
 
@@ -240,9 +316,10 @@ def monitor_disk_simple(path, interval_sec=5.0):
     def _get_disk_usage():
         """获取磁盘使用率"""
         try:
-            # 使用analyzer的方法
-            analyzer = DiskAnalyzer(target, max_depth=1, use_cache=False)
-            return analyzer._get_disk_usage()
+            # 只需要使用率：直接一次 statvfs/GetDiskFreeSpaceExW，不再每个周期构造分析器
+            # （分析器内部的结果还有 5 秒复用窗口，监控间隔短时会读到旧值）
+            total, used, _ = shutil.disk_usage(target)
+            return used / total * 100.0 if total else 0.0
         except:
             return 50.0  # 默认值
 
@@ -256,14 +333,12 @@ def monitor_disk_simple(path, interval_sec=5.0):
                 sys.stdout.write("\r\033[2K" + line)
                 sys.stdout.flush()
 
-                # 检查退出
-                key = _read_key_nonblocking()
+                # 等待下一个采样周期，期间按 q 立即退出
+                key = _read_key_nonblocking(interval_sec)
                 if key and key.lower() == 'q':
                     print("\n[监控] 退出监控模式")
                     break
 
-                time.sleep(interval_sec)
-
         except KeyboardInterrupt:
             print("\n[监控] 监控被中断")
         except Exception as e:
@@ -313,8 +388,8 @@ def print_usage_summary(result):
     print("扫描结果摘要")
     print("=" * 60)
 
-    total_gb = result.get('total_size', 0) / (1024 ** 3)
-    print(f"总大小: {total_gb:.2f} GB ({format_size(result.get('total_size', 0))})")
+    total_size = result.get('total_size', 0)
+    print(f"总大小: {total_size / (1 << 30):.2f} GB ({format_size(total_size)})")
 
     if 'file_types' in result:
         print(f"文件类型数: {len(result['file_types'])}")
@@ -352,6 +427,10 @@ def main():
                         help="快速模式")
     parser.add_argument("--quiet", action="store_true",
                         help="安静模式，减少输出")
+    parser.add_argument("--one-filesystem", "-x", action="store_true",
+                        help="只扫描目标所在的文件系统，不进入其他挂载点（/proc、/sys、网络盘等）")
+    parser.add_argument("--gzip", action="store_true",
+                        help="HTML 报告压缩输出为 .html.gz（适合归档或经 HTTP 服务查看）")
 
     args = parser.parse_args()
 
@@ -394,7 +473,8 @@ def main():
             args.depth,
             method=scan_method,
             workers=args.workers,
-            use_cache=not args.no_cache
+            use_cache=not args.no_cache,
+            one_filesystem=args.one_filesystem
         )
 
         if stopped:
@@ -410,18 +490,21 @@ def main():
                 report_name = "enhanced_disk_report.html"
             else:
                 report_name = "disk_report.html"
+            if args.gzip:
+                report_name += ".gz"
 
             try:
                 report_path = reporter.generate(report_name)
                 print(f"[报告] 已生成: {report_path}")
 
-                # 尝试在浏览器中打开
-                try:
-                    import webbrowser
-                    webbrowser.open(f"file://{report_path}")
-                    print("[报告] 已在浏览器中打开")
-                except:
-                    pass
+                # 尝试在浏览器中打开（file:// 下浏览器不会解压 .gz，压缩报告不自动打开）
+                if not args.gzip:
+                    try:
+                        import webbrowser
+                        webbrowser.open(f"file://{report_path}")
+                        print("[报告] 已在浏览器中打开")
+                    except:
+                        pass
 
             except Exception as e:
                 print(f"[错误] 报告生成失败: {e}")
@@ -1,13 +1,21 @@
 import curses
+import math
 import os
+from functools import lru_cache
 
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
 
+
+@lru_cache(maxsize=4096)
 def format_size(size):
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if size < 1024:
-            return f"{size:.2f} {unit}"
-        size /= 1024
-    return f"{size:.2f} PB"
+    # 单位直接由位长得出（每 10 位一档），不再循环除 1024；常见大小（0、块大小）命中缓存
+    if size < 1024:
+        return f"{size:.2f} B"
+    # inf/nan 没有位长，按原循环的结果落到 PB（"inf PB"/"nan PB"）
+    if isinstance(size, float) and not math.isfinite(size):
+        return f"{size:.2f} PB"
+    unit = min((int(size).bit_length() - 1) // 10, 5)
+    return f"{size / (1 << (10 * unit)):.2f} {_SIZE_UNITS[unit]}"
 
 
 class TerminalUI: